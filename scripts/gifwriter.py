@@ -2,73 +2,106 @@
 Minimal animated GIF89a writer with transparency. No dependencies.
 """
 import struct
+from math import isqrt
 from pathlib import Path
 
+# Sparse LZW string table indexed by (prefix_code << 8) | byte, 0 = no entry.
+# Allocated once and shared by lzw_encode calls, which reset only the slots
+# they used, so each frame avoids re-allocating a 1M-entry table.
+_LZW_TABLE = [0] * (4096 << 8)
 
-def lzw_encode(data, min_bits=8):
-    """Encode list of byte values (0-255) to LZW-compressed bytes for GIF."""
+
+def lzw_encode(data, min_bits=8, writer=None):
+    """
+    Encode byte values (0-255, e.g. bytes or list) to LZW-compressed bytes for GIF.
+    writer: optional callable; if given, output is passed to it as GIF subblocks
+    (length byte + up to 255 bytes) as soon as each fills, and None is returned.
+    The block terminator is left to the caller.
+    """
     clear_code = 1 << min_bits
     end_code = clear_code + 1
     max_code = 4095
     code_size = min_bits + 1
     next_code = end_code + 1
+    # next_code value at which codes widen by one bit; past 12 bits it is
+    # never reached, since the table stops growing at max_code
+    grow_at = (1 << code_size) + 1
 
-    table = {bytes([i]): i for i in range(256)}
-
-    result = []
-    chunk_bits = []
-    prefix = b""
+    # Single bytes are their own code; longer strings live in the sparse table.
+    table = _LZW_TABLE
+    used = []
 
-    def flush_bits():
-        nonlocal chunk_bits
-        while len(chunk_bits) >= 8:
-            byte = sum((chunk_bits.pop(0) & 1) << i for i in range(8))
-            result.append(byte)
-        return
+    out = bytearray()
+    out_append = out.append
+    buf = 0
+    nbits = 0
 
     def write_code(c):
-        nonlocal code_size, chunk_bits
-        for b in range(code_size):
-            chunk_bits.append((c >> b) & 1)
-        flush_bits()
+        nonlocal buf, nbits
+        buf |= c << nbits
+        nbits += code_size
+        while nbits >= 8:
+            out_append(buf & 0xFF)
+            buf >>= 8
+            nbits -= 8
+        if writer is not None and len(out) >= 255:
+            writer(b"\xff" + out[:255])
+            del out[:255]
 
     write_code(clear_code)
 
-    for byte in data:
-        new_prefix = prefix + bytes([byte])
-        if new_prefix in table:
-            prefix = new_prefix
-        else:
-            write_code(table[prefix])
-            if next_code <= max_code:
-                table[new_prefix] = next_code
-                next_code += 1
-                if next_code > (1 << code_size):
-                    code_size = min(12, code_size + 1)
-            prefix = bytes([byte])
-
-    if prefix:
-        write_code(table[prefix])
+    it = iter(data)
+    prefix = next(it, None)
+    try:
+        for byte in it:
+            key = (prefix << 8) | byte
+            nxt = table[key]
+            if nxt:
+                prefix = nxt
+            else:
+                write_code(prefix)
+                if next_code <= max_code:
+                    table[key] = next_code
+                    used.append(key)
+                    next_code += 1
+                    if next_code == grow_at:
+                        code_size += 1
+                        grow_at = (1 << code_size) + 1
+                prefix = byte
+    finally:
+        for key in used:
+            table[key] = 0
+
+    if prefix is not None:
+        write_code(prefix)
     write_code(end_code)
-    if chunk_bits:
-        while len(chunk_bits) < 8:
-            chunk_bits.append(0)
-        flush_bits()
-    return bytes(result)
+    if nbits:
+        out_append(buf & 0xFF)
+    if writer is None:
+        return bytes(out)
+    while out:
+        block = out[:255]
+        writer(bytes([len(block)]) + block)
+        del out[:255]
+    return None
 
 
 def write_gif(frames, palette, filepath, duration_ms=83, transparent_index=0):
     """
     Write animated GIF89a.
-    frames: list of 2D arrays (H rows, W cols) of palette indices 0-255
-    palette: list of (r,g,b), length 256; index transparent_index is transparent
+    frames: list of canvases (H bytearray rows of W palette indices 0-255)
+    palette: list of (r,g,b) covering every index used; index transparent_index is transparent
+    The color table and LZW code size are sized to the highest index used.
     """
     if not frames:
         return
     H, W = len(frames[0]), len(frames[0][0])
-    # Build global color table (256 colors, 3 bytes each)
-    pal_bytes = bytearray(768)
-    for i, c in enumerate(palette[:256]):
+    flats = [b"".join(frame) for frame in frames]
+    # Color table holds 2**min_bits colors; GIF needs a minimum code size of at least 2
+    n_colors = max(transparent_index, *(max(flat) for flat in flats)) + 1
+    min_bits = max(2, (n_colors - 1).bit_length())
+    pal_bytes = bytearray(3 << min_bits)
+    for i, c in enumerate(palette[: 1 << min_bits]):
         pal_bytes[i * 3 : i * 3 + 3] = c[0], c[1], c[2]
 
     with open(filepath, "wb") as f:
@@ -76,56 +109,58 @@ def write_gif(frames, palette, filepath, duration_ms=83, transparent_index=0):
         f.write(b"GIF89a")
         # Logical Screen Descriptor: width, height, packed, bg, aspect
         f.write(struct.pack("<HH", W, H))
-        # packed: global color table 1, color resolution 8, sort 0, size 7 (256 colors) -> 0xf7
-        f.write(bytes([0xF7, 0, 0]))
+        # packed: global color table 1, color resolution 8, sort 0, size min_bits - 1
+        f.write(bytes([0xF0 | (min_bits - 1), 0, 0]))
         # Global Color Table
         f.write(pal_bytes)
 
         # Netscape Application Extension (loop)
         f.write(b"\x21\xFF\x0BNETSCAPE2.0\x03\x01\x00\x00\x00")
 
-        for idx, frame in enumerate(frames):
-            # Graphic Control Extension: disposal=2, transparent, duration
-            f.write(b"\x21\xF9\x04\x02")  # disposal=2 (restore to background)
-            f.write(struct.pack("<H", duration_ms))
-            f.write(bytes([transparent_index, 0]))
-            # Image Descriptor
-            f.write(b"\x2C")
-            f.write(struct.pack("<HHHHH", 0, 0, W, H, 0))
-            # Image Data: LZW minimum code size (8), then LZW-compressed subblocks
-            flat = []
-            for row in frame:
-                flat.extend(row)
-            f.write(bytes([8]))  # LZW minimum code size
-            compressed = lzw_encode(flat, min_bits=8)
-            # Subblocks (max 255 bytes each)
-            pos = 0
-            while pos < len(compressed):
-                block_len = min(255, len(compressed) - pos)
-                f.write(bytes([block_len]))
-                f.write(compressed[pos : pos + block_len])
-                pos += block_len
-            f.write(b"\x00")
+        # Per-frame headers are identical for every frame, so pack them once.
+        # Graphic Control Extension: packed 0x09 = disposal 2 (restore to background) |
+        # transparent flag; delay is in hundredths of a second
+        gce = b"\x21\xF9\x04\x09" + struct.pack("<HBB", duration_ms // 10, transparent_index, 0)
+        # Image Descriptor: left, top, width, height, packed (no local color table)
+        img_desc = b"\x2C" + struct.pack("<HHHHB", 0, 0, W, H, 0)
+
+        # Subblock stream per distinct raster, so repeated frames skip LZW
+        compressed_cache = {}
+        # Frame header up to the LZW minimum code size, then subblocks + terminator
+        frame_head = gce + img_desc + bytes([min_bits])
+        for flat in flats:
+            blocks = compressed_cache.get(flat)
+            if blocks is None:
+                # Subblocks (max 255 bytes each), emitted by the encoder
+                blocks = compressed_cache[flat] = bytearray()
+                lzw_encode(flat, min_bits=min_bits, writer=blocks.extend)
+            buf = bytearray(frame_head)
+            buf += blocks
+            buf += b"\x00"
+            f.write(buf)
         f.write(b";")
 
 
 def create_canvas(w, h, default=0):
-    """Create 2D list of default index (0 = transparent)."""
-    return [[default] * w for _ in range(h)]
+    """Create list of h bytearray rows of default index (0 = transparent)."""
+    return [bytearray([default]) * w for _ in range(h)]
 
 
 def draw_rect(canvas, x1, y1, x2, y2, idx, outline_idx=None):
     """Fill rectangle (inclusive), optional outline. Clips to canvas."""
     H, W = len(canvas), len(canvas[0])
-    for y in range(max(0, y1), min(H, y2 + 1)):
-        for x in range(max(0, x1), min(W, x2 + 1)):
-            canvas[y][x] = idx
+    lo, hi = max(0, x1), min(W, x2 + 1)
+    if lo < hi:
+        span = bytes([idx]) * (hi - lo)
+        for y in range(max(0, y1), min(H, y2 + 1)):
+            canvas[y][lo:hi] = span
     if outline_idx is not None:
-        for x in range(max(0, x1), min(W, x2 + 1)):
+        if lo < hi:
+            edge = bytes([outline_idx]) * (hi - lo)
             if 0 <= y1 < H:
-                canvas[y1][x] = outline_idx
+                canvas[y1][lo:hi] = edge
             if 0 <= y2 < H:
-                canvas[y2][x] = outline_idx
+                canvas[y2][lo:hi] = edge
         for y in range(max(0, y1), min(H, y2 + 1)):
             if 0 <= x1 < W:
                 canvas[y][x1] = outline_idx
@@ -143,12 +178,14 @@ def draw_line(canvas, x0, y0, x1, y1, idx, thickness=1):
     err = dx - dy
     x, y = x0, y0
     half = thickness // 2
+    stamp = bytes([idx]) * (2 * half + 1)
     for _ in range(max(dx, dy) + 1):
-        for oy in range(-half, half + 1):
-            for ox in range(-half, half + 1):
-                nx, ny = x + ox, y + oy
-                if 0 <= nx < W and 0 <= ny < H:
-                    canvas[ny][nx] = idx
+        # Square brush: one clipped row span per brush row
+        lo, hi = max(0, x - half), min(W, x + half + 1)
+        if lo < hi:
+            span = stamp[: hi - lo]
+            for ny in range(max(0, y - half), min(H, y + half + 1)):
+                canvas[ny][lo:hi] = span
         if x == x1 and y == y1:
             break
         e2 = 2 * err
@@ -163,45 +200,60 @@ def draw_line(canvas, x0, y0, x1, y1, idx, thickness=1):
 def draw_ellipse(canvas, cx, cy, rx, ry, fill_idx, outline_idx=None):
     """Fill ellipse (cx,cy) radii rx,ry. outline optional."""
     H, W = len(canvas), len(canvas[0])
-    for dy in range(-ry, ry + 1):
-        for dx in range(-rx, rx + 1):
-            if (dx * dx) / (rx * rx + 1e-9) + (dy * dy) / (ry * ry + 1e-9) <= 1:
-                x, y = cx + dx, cy + dy
-                if 0 <= x < W and 0 <= y < H:
-                    canvas[y][x] = fill_idx
-    if outline_idx is not None and rx >= 2 and ry >= 2:
-        for dy in range(-ry, ry + 1):
-            for dx in range(-rx, rx + 1):
-                if (dx * dx) / (rx * rx + 1e-9) + (dy * dy) / (ry * ry + 1e-9) >= 0.92 and (dx * dx) / (rx * rx + 1e-9) + (dy * dy) / (ry * ry + 1e-9) <= 1.02:
-                    x, y = cx + dx, cy + dy
-                    if 0 <= x < W and 0 <= y < H:
-                        canvas[y][x] = outline_idx
+    a2, b2 = rx * rx, ry * ry
+    outline = outline_idx is not None and rx >= 2 and ry >= 2
+    for dy in range(max(-ry, -cy), min(ry, H - 1 - cy) + 1):
+        row = canvas[cy + dy]
+        # Widest |dx| with dx^2/rx^2 + dy^2/ry^2 <= 1, in integer arithmetic
+        xs = isqrt(a2 * (b2 - dy * dy) // b2) if ry else rx
+        lo, hi = max(0, cx - xs), min(W, cx + xs + 1)
+        if lo < hi:
+            row[lo:hi] = bytes([fill_idx]) * (hi - lo)
+        if not outline:
+            continue
+        # Outline ring 0.92 <= dx^2/rx^2 + dy^2/ry^2 <= 1.02: |dx| in (inner, outer]
+        outer = min(rx, isqrt((102 * a2 * b2 - 100 * a2 * dy * dy) // (100 * b2)))
+        m = 92 * a2 * b2 - 100 * a2 * dy * dy
+        inner = isqrt((m - 1) // (100 * b2)) if m > 0 else -1
+        for lo, hi in ((cx - outer, cx - inner), (cx + inner + 1, cx + outer + 1)):
+            lo, hi = max(0, lo), min(W, hi)
+            if lo < hi:
+                row[lo:hi] = bytes([outline_idx]) * (hi - lo)
 
 
 def draw_polygon(canvas, pts, fill_idx, outline_idx=None):
-    """Fill polygon (list of (x,y)). Simple scanline fill."""
+    """Fill polygon (list of (x,y)). Scanline fill with an active edge table."""
     if len(pts) < 3:
         return
     H, W = len(canvas), len(canvas[0])
     min_y = max(0, min(p[1] for p in pts))
     max_y = min(H - 1, max(p[1] for p in pts))
+    # Non-horizontal edges as (y_top, y_bottom, x_top, dx, dy), sorted by y_top
+    edges = []
+    n = len(pts)
+    for i in range(n):
+        x1, y1 = pts[i]
+        x2, y2 = pts[(i + 1) % n]
+        if y1 > y2:
+            x1, y1, x2, y2 = x2, y2, x1, y1
+        if y1 != y2:
+            edges.append((y1, y2, x1, x2 - x1, y2 - y1))
+    edges.sort()
+    fill = bytes([fill_idx])
+    active = []
+    k = 0
     for y in range(min_y, max_y + 1):
-        intersections = []
-        n = len(pts)
-        for i in range(n):
-            x1, y1 = pts[i]
-            x2, y2 = pts[(i + 1) % n]
-            if y1 > y2:
-                x1, y1, x2, y2 = x2, y2, x1, y1
-            if y1 <= y < y2 or (y == y2 and y2 != y1):
-                if y2 != y1:
-                    x = x1 + (x2 - x1) * (y - y1) / (y2 - y1)
-                    intersections.append(x)
-        intersections.sort()
+        # Edges cross row y while y_top <= y <= y_bottom
+        while k < len(edges) and edges[k][0] <= y:
+            active.append(edges[k])
+            k += 1
+        active = [e for e in active if e[1] >= y]
+        intersections = sorted(x1 + dx * (y - y1) / dy for y1, _, x1, dx, dy in active)
         for i in range(0, len(intersections), 2):
             x1, x2 = int(intersections[i]), int(intersections[i + 1]) if i + 1 < len(intersections) else int(intersections[i])
-            for x in range(max(0, x1), min(W, x2 + 1)):
-                canvas[y][x] = fill_idx
+            lo, hi = max(0, x1), min(W, x2 + 1)
+            if lo < hi:
+                canvas[y][lo:hi] = fill * (hi - lo)
     if outline_idx is not None:
         for i in range(len(pts)):
             x0, y0 = pts[i]
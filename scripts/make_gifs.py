@@ -6,6 +6,8 @@ No external deps: uses scripts/gifwriter.py (pure Python).
 """
 import math
 import sys
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).resolve().parent))
@@ -30,25 +32,43 @@ BLUE_DARK = (37, 99, 235)
 BLUE_MID = (59, 130, 246)
 BLUE_LIGHT = (147, 197, 253)
 WHITE = (255, 255, 255)
+# write_gif sizes the color table to the indices used, so no padding is needed
 PALETTE = [(0, 0, 0), BLUE_DARK, BLUE_MID, BLUE_LIGHT, WHITE]
-while len(PALETTE) < 256:
-    PALETTE.append(WHITE)
+
+# Node centres for the data-driven animation (left, middle, right)
+DATA_NODES = [(W // 2 - 100, H // 2), (W // 2, H // 2), (W // 2 + 100, H // 2)]
+
+
+def _frames_by_state(states, render):
+    """Canvas per frame from its state; frames with equal states share one render."""
+    drawn = {}
+    for state in states:
+        if state not in drawn:
+            drawn[state] = render(state)
+    return [drawn[state] for state in states]
+
+
+@lru_cache(maxsize=None)
+def _planning_setup(w, h):
+    """Bar (left x, relative height) pairs, bar width and baseline y for a w x h canvas."""
+    cx, cy = w // 2, h // 2
+    bar_w, gap = 44, 20
+    heights = [0.6, 0.85, 0.5, 0.9, 0.7]
+    left = cx - (len(heights) * (bar_w + gap) - gap) // 2
+    bars = tuple((left + j * (bar_w + gap), bh) for j, bh in enumerate(heights))
+    return bars, bar_w, cy + 60
 
 
 def draw_planning_frames():
     """Bar chart growth (product planning)."""
     frames = []
+    bars, bar_w, y_base = _planning_setup(W, H)
     for i in range(NUM_FRAMES):
         t = (i + 1) / NUM_FRAMES
         c = create_canvas(W, H, TRANS)
-        cx, cy = W // 2, H // 2
-        bar_w, gap = 44, 20
-        heights = [0.6, 0.85, 0.5, 0.9, 0.7]
-        for j, h in enumerate(heights):
-            x = cx - (len(heights) * (bar_w + gap) - gap) // 2 + j * (bar_w + gap)
-            fill_h = int(120 * h * t)
-            y_top = cy + 60 - fill_h
-            draw_rect(c, x, y_top, x + bar_w, cy + 60, IDX_LIGHT, IDX_MID)
+        for x, bh in bars:
+            fill_h = int(120 * bh * t)
+            draw_rect(c, x, y_base - fill_h, x + bar_w, y_base, IDX_LIGHT, IDX_MID)
         frames.append(c)
     return frames
 
@@ -60,15 +80,13 @@ def draw_marketing_frames():
     x0, y0 = margin, H - margin - 40
     x1, y1 = W - margin, margin + 40
     n_pts = 8
+    # Point x positions and fractions along the line are the same every frame
+    xs = [x0 + (x1 - x0) * k / n_pts for k in range(n_pts + 1)]
+    fracs = [k / n_pts for k in range(n_pts + 1)]
     for i in range(NUM_FRAMES):
         t = (i + 1) / NUM_FRAMES
         c = create_canvas(W, H, TRANS)
-        pts = []
-        for k in range(n_pts + 1):
-            x = x0 + (x1 - x0) * k / n_pts
-            progress = (k / n_pts) * t
-            y = y0 - (y0 - y1) * (0.3 + 0.7 * progress)
-            pts.append((x, y))
+        pts = [(x, y0 - (y0 - y1) * (0.3 + 0.7 * (f * t))) for x, f in zip(xs, fracs)]
         for k in range(len(pts) - 1):
             draw_line(c, int(pts[k][0]), int(pts[k][1]), int(pts[k + 1][0]), int(pts[k + 1][1]), IDX_MID, 4)
         head = min(int(t * n_pts), n_pts)
@@ -80,54 +98,63 @@ def draw_marketing_frames():
 
 def draw_data_frames():
     """Pulsing nodes (data-driven)."""
-    frames = []
-    for i in range(NUM_FRAMES):
-        phase = (i / NUM_FRAMES) * 2 * math.pi
+    cx, cy = DATA_NODES[1]
+    # Node radii for every (frame, node), computed once up front
+    radii = [
+        tuple(int(20 * (0.85 + 0.15 * (1 + math.sin((i / NUM_FRAMES) * 2 * math.pi + j * 2.1)))) for j in range(len(DATA_NODES)))
+        for i in range(NUM_FRAMES)
+    ]
+
+    def render(frame_radii):
         c = create_canvas(W, H, TRANS)
-        cx, cy = W // 2, H // 2
-        nodes = [(cx - 100, cy), (cx, cy), (cx + 100, cy)]
-        for j, (nx, ny) in enumerate(nodes):
-            pulse = 0.85 + 0.15 * (1 + math.sin(phase + j * 2.1))
-            r = int(20 * pulse)
+        for (nx, ny), r in zip(DATA_NODES, frame_radii):
             draw_ellipse(c, nx, ny, r, r, IDX_LIGHT, IDX_MID)
         draw_line(c, cx - 100, cy, cx, cy, IDX_MID, 3)
         draw_line(c, cx, cy, cx + 100, cy, IDX_MID, 3)
-        frames.append(c)
-    return frames
+        return c
+
+    return _frames_by_state(radii, render)
 
 
 def draw_discovery_frames():
     """Magnifying glass (discovery)."""
-    frames = []
-    for i in range(NUM_FRAMES):
-        t = (i + 1) / NUM_FRAMES
+    cx, cy = W // 2, H // 2
+    # Lens radius per frame; it stops growing after ~80% of the loop
+    radii = [int(50 * min((i + 1) / NUM_FRAMES * 1.2, 1.0)) for i in range(NUM_FRAMES)]
+
+    def render(r):
         c = create_canvas(W, H, TRANS)
-        cx, cy = W // 2, H // 2
-        r = int(50 * min(t * 1.2, 1.0))
         draw_ellipse(c, cx, cy - 20, r, r, IDX_LIGHT, IDX_MID)
         hx, hy = cx + r, cy + r - 20
         draw_line(c, hx, hy, hx + 30, hy + 40, IDX_MID, 5)
         bx, by = cx + 70, cy - 50
         draw_ellipse(c, bx, by, 15, 15, IDX_LIGHT, IDX_DARK)
-        frames.append(c)
-    return frames
+        return c
+
+    return _frames_by_state(radii, render)
+
+
+@lru_cache(maxsize=None)
+def _operation_setup(w, h):
+    """Bar (top, bottom) rows, left x and full bar width for a w x h canvas."""
+    cx, cy = w // 2, h // 2
+    bar_h, bar_w_max = 24, 180
+    rows = tuple((y - bar_h // 2, y + bar_h // 2) for y in (cy - 50, cy - 10, cy + 30))
+    return rows, cx - bar_w_max // 2, bar_w_max
 
 
 def draw_operation_frames():
     """Horizontal bars (operation)."""
     frames = []
+    rows, x1, bar_w_max = _operation_setup(W, H)
     for i in range(NUM_FRAMES):
         t = (i + 1) / NUM_FRAMES
         c = create_canvas(W, H, TRANS)
-        cx, cy = W // 2, H // 2
-        bar_h, bar_w_max = 24, 180
-        ys = [cy - 50, cy - 10, cy + 30]
-        for j, y in enumerate(ys):
+        for j, (y_top, y_bot) in enumerate(rows):
             fill_t = min(t * 1.2 - j * 0.15, 1.0)
             if fill_t > 0:
                 w = int(bar_w_max * fill_t)
-                x1 = cx - bar_w_max // 2
-                draw_rect(c, x1, y - bar_h // 2, x1 + w, y + bar_h // 2, IDX_LIGHT, IDX_MID)
+                draw_rect(c, x1, y_top, x1 + w, y_bot, IDX_LIGHT, IDX_MID)
         frames.append(c)
     return frames
 
@@ -135,10 +162,10 @@ def draw_operation_frames():
 def draw_expansion_frames():
     """Upward arrow (expansion)."""
     frames = []
+    cx, cy = W // 2, H // 2 + 20
     for i in range(NUM_FRAMES):
         t = (i + 1) / NUM_FRAMES
         c = create_canvas(W, H, TRANS)
-        cx, cy = W // 2, H // 2 + 20
         stem_h = int(100 * t)
         draw_rect(c, cx - 8, cy + 40 - stem_h, cx + 8, cy + 40, IDX_MID, IDX_DARK)
         if t >= 0.5:
@@ -148,6 +175,14 @@ def draw_expansion_frames():
     return frames
 
 
+def _render_one(config):
+    """Draw one animation and write it to ASSETS; runs in a worker process."""
+    name, drawer = config
+    out = ASSETS / name
+    write_gif(drawer(), PALETTE, out, duration_ms=DURATION_MS, transparent_index=0)
+    return out
+
+
 def main():
     ASSETS.mkdir(parents=True, exist_ok=True)
     configs = [
@@ -158,11 +193,10 @@ def main():
         ("engine-operation.gif", draw_operation_frames),
         ("engine-expansion.gif", draw_expansion_frames),
     ]
-    for name, drawer in configs:
-        frames = drawer()
-        out = ASSETS / name
-        write_gif(frames, PALETTE, out, duration_ms=DURATION_MS, transparent_index=0)
-        print("Saved:", out)
+    # Each GIF is independent and CPU-bound, so encode them in parallel
+    with ProcessPoolExecutor() as ex:
+        for out in ex.map(_render_one, configs):
+            print("Saved:", out)
     print("Done. All GIFs in", ASSETS)
 
 